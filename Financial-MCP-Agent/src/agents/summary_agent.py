@@ -13,6 +13,7 @@ import re
 from utils.state_definition import AgentState
 from utils.logging_config import setup_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
 from utils.execution_logger import get_execution_logger
+from utils.llm_cache import get_llm_cache
 from dotenv import load_dotenv
 
 # 从.env文件加载环境变量
@@ -179,11 +180,14 @@ async def summary_agent(state: AgentState) -> Dict[str, Any]:
     execution_logger = get_execution_logger()
     agent_name = "summary_agent"
 
-    # 从状态中提取当前数据、消息和用户查询
+    # 从状态中提取当前数据、元数据和用户查询
     current_data = state.get("data", {})
-    messages = state.get("messages", [])
+    current_metadata = state.get("metadata", {})
     user_query = current_data.get("query", "")
 
+    # 只返回本节点写入的字段，由AgentState的合并规则并入全局状态
+    data_updates: Dict[str, Any] = {}
+
     # 记录 Agent开始执行，包含可用的分析类型
     execution_logger.log_agent_start(agent_name, {
         "user_query": user_query,
@@ -375,13 +379,13 @@ async def summary_agent(state: AgentState) -> Dict[str, Any]:
             if not all([api_key, base_url, model_name]):
                 logger.error(
                     f"{ERROR_ICON} SummaryAgent: Missing OpenAI environment variables.")
-                current_data["summary_error"] = "Missing OpenAI environment variables."
+                data_updates["summary_error"] = "Missing OpenAI environment variables."
 
                 # 记录 Agent执行失败
-                execution_logger.log_agent_complete(agent_name, current_data, time.time(
+                execution_logger.log_agent_complete(agent_name, data_updates, time.time(
                 ) - agent_start_time, False, "Missing OpenAI environment variables")
 
-                return {"data": current_data, "messages": messages}
+                return {"data": data_updates, "messages": []}
 
             # 记录模型配置信息
             model_config = {
@@ -404,7 +408,8 @@ async def summary_agent(state: AgentState) -> Dict[str, Any]:
                 api_key=api_key,
                 base_url=base_url,
                 temperature=0.5,  # 提高温度以增加创造性和更自然的表达
-                max_tokens=5000   # 增大输出长度以生成更详细的综合报告
+                max_tokens=5000,  # 增大输出长度以生成更详细的综合报告
+                cache=get_llm_cache(current_metadata.get("llm_cache_namespace"))  # 同股票同日复用相同提示词的输出
             )
 
             # 记录LLM交互开始时间
@@ -479,8 +484,8 @@ async def summary_agent(state: AgentState) -> Dict[str, Any]:
             f"{SUCCESS_ICON} SummaryAgent: Report saved to {report_path}")
 
         # 返回更新后的状态，包含最终报告
-        current_data["final_report"] = final_report
-        current_data["report_path"] = report_path
+        data_updates["final_report"] = final_report
+        data_updates["report_path"] = report_path
 
         # 记录 Agent执行成功
         total_execution_time = time.time() - agent_start_time
@@ -492,12 +497,12 @@ async def summary_agent(state: AgentState) -> Dict[str, Any]:
             "total_execution_time": total_execution_time
         }, total_execution_time, True)
 
-        return {"data": current_data, "messages": messages}
+        return {"data": data_updates, "messages": []}
 
     except Exception as e:
         logger.error(
             f"{ERROR_ICON} SummaryAgent: Error generating final report: {e}", exc_info=True)
-        current_data["summary_error"] = f"Error generating final report: {e}"
+        data_updates["summary_error"] = f"Error generating final report: {e}"
 
         # 即使出现错误也创建最小化的报告
         error_report = f"""
@@ -514,7 +519,7 @@ async def summary_agent(state: AgentState) -> Dict[str, Any]:
         
         Please review the individual analyses directly for more information.
         """
-        current_data["final_report"] = error_report
+        data_updates["final_report"] = error_report
 
         # 也将错误报告保存到文件
         timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -555,13 +560,13 @@ async def summary_agent(state: AgentState) -> Dict[str, Any]:
 
         logger.info(
             f"{ERROR_ICON} SummaryAgent: Error report saved to {report_path}")
-        current_data["report_path"] = report_path
+        data_updates["report_path"] = report_path
 
         # 记录 Agent执行失败
         execution_logger.log_agent_complete(
-            agent_name, current_data, time.time() - agent_start_time, False, str(e))
+            agent_name, data_updates, time.time() - agent_start_time, False, str(e))
 
-        return {"data": current_data, "messages": messages}
+        return {"data": data_updates, "messages": []}
 
 
 # 本地测试函数
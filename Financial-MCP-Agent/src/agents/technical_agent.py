@@ -17,6 +17,7 @@ from utils.state_definition import AgentState
 from tools.mcp_client import get_mcp_tools
 from utils.logging_config import setup_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
 from utils.execution_logger import get_execution_logger
+from utils.llm_cache import get_llm_cache
 from dotenv import load_dotenv
 
 # 从.env文件加载环境变量
@@ -41,12 +42,16 @@ async def technical_agent(state: AgentState) -> AgentState:
     execution_logger = get_execution_logger()
     agent_name = "technical_agent"
 
-    # 从状态中提取当前数据、消息和元数据
+    # 从状态中提取当前数据和元数据（只读）
     current_data = state.get("data", {})
-    current_messages = state.get("messages", [])
     current_metadata = state.get("metadata", {})
     user_query = current_data.get("query")
 
+    # 节点只返回自己写入的字段（部分更新），由AgentState的合并规则并入全局状态，
+    # 避免并行的分析Agent各自复制并回写整份data
+    data_updates: Dict[str, Any] = {}
+    metadata_updates: Dict[str, Any] = {}
+
     # 记录 Agent开始执行，包含关键信息
     execution_logger.log_agent_start(agent_name, {
         "user_query": user_query,
@@ -58,9 +63,9 @@ async def technical_agent(state: AgentState) -> AgentState:
     # 验证用户查询是否存在
     if not user_query:
         logger.error(f"{ERROR_ICON} TechnicalAgent: User query is missing in state data.")
-        current_data["technical_analysis_error"] = "User query is missing."
-        execution_logger.log_agent_complete(agent_name, current_data, 0, False, "User query is missing")
-        return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+        data_updates["technical_analysis_error"] = "User query is missing."
+        execution_logger.log_agent_complete(agent_name, data_updates, 0, False, "User query is missing")
+        return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
     # 记录 Agent开始时间，用于计算执行时长
     agent_start_time = time.time()
@@ -74,9 +79,9 @@ async def technical_agent(state: AgentState) -> AgentState:
         # 验证必要的环境变量是否存在
         if not all([api_key, base_url, model_name]):
             logger.error(f"{ERROR_ICON} TechnicalAgent: Missing OpenAI environment variables.")
-            current_data["technical_analysis_error"] = "Missing OpenAI environment variables."
-            execution_logger.log_agent_complete(agent_name, current_data, time.time() - agent_start_time, False, "Missing OpenAI environment variables")
-            return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+            data_updates["technical_analysis_error"] = "Missing OpenAI environment variables."
+            execution_logger.log_agent_complete(agent_name, data_updates, time.time() - agent_start_time, False, "Missing OpenAI environment variables")
+            return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
         logger.info(f"{WAIT_ICON} TechnicalAgent: Creating ChatOpenAI with model {model_name}")
         # 创建LLM实例，设置合适的参数
@@ -85,7 +90,8 @@ async def technical_agent(state: AgentState) -> AgentState:
             api_key=api_key,
             base_url=base_url,
             temperature=0.3,  # 较低的温度确保分析的一致性
-            max_tokens=6000   # 增加token数量用于详细分析
+            max_tokens=6000,  # 增加token数量用于详细分析
+            cache=get_llm_cache(current_metadata.get("llm_cache_namespace"))  # 同股票同日复用相同提示词的输出
         )
 
         # 2. 获取MCP工具集
@@ -94,9 +100,9 @@ async def technical_agent(state: AgentState) -> AgentState:
             mcp_tools = await get_mcp_tools()
             if not mcp_tools:
                 logger.error(f"{ERROR_ICON} TechnicalAgent: No MCP tools available.")
-                current_data["technical_analysis_error"] = "No MCP tools available."
-                execution_logger.log_agent_complete(agent_name, current_data, time.time() - agent_start_time, False, "No MCP tools available")
-                return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+                data_updates["technical_analysis_error"] = "No MCP tools available."
+                execution_logger.log_agent_complete(agent_name, data_updates, time.time() - agent_start_time, False, "No MCP tools available")
+                return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
             logger.info(f"{SUCCESS_ICON} TechnicalAgent: Successfully loaded {len(mcp_tools)} tools.")
 
@@ -104,9 +110,11 @@ async def technical_agent(state: AgentState) -> AgentState:
             tool_names = [tool.name for tool in mcp_tools]
             logger.info(f"Available tools: {tool_names}")
 
-            # 3. 创建ReAct Agent - 只传入LLM和工具
+            # 3. 创建ReAct Agent - 传入LLM、工具和共享的系统提示词
             logger.info(f"{WAIT_ICON} TechnicalAgent: Creating ReAct agent...")
-            agent = create_react_agent(llm, mcp_tools)
+            # 共享的系统提示词前缀在各分析Agent间保持一致，便于服务端复用前缀缓存
+            shared_system_prompt = current_data.get("shared_system_prompt")
+            agent = create_react_agent(llm, mcp_tools, prompt=shared_system_prompt)
 
             # 4. 准备输入数据，构建详细的分析请求
             stock_code = current_data.get('stock_code', 'Unknown')
@@ -189,7 +197,8 @@ async def technical_agent(state: AgentState) -> AgentState:
             execution_logger.log_llm_interaction(
                 agent_name=agent_name,
                 interaction_type="react_agent",
-                input_messages=[{"role": "user", "content": agent_input}],
+                input_messages=([{"role": "system", "content": shared_system_prompt}] if shared_system_prompt else [])
+                + [{"role": "user", "content": agent_input}],
                 output_content=final_output,
                 model_config=model_config,
                 execution_time=execution_time
@@ -198,14 +207,13 @@ async def technical_agent(state: AgentState) -> AgentState:
             logger.info(f"{SUCCESS_ICON} TechnicalAgent: Successfully completed technical analysis.")
             
             # 8. 更新状态，保存分析结果和元数据
-            current_data["technical_analysis"] = final_output
-            current_metadata["technical_agent_executed"] = True
-            current_metadata["technical_agent_timestamp"] = str(time.time())
-            current_metadata["technical_agent_execution_time"] = f"{execution_time:.2f} seconds"
+            data_updates["technical_analysis"] = final_output
+            metadata_updates["technical_agent_executed"] = True
+            metadata_updates["technical_agent_timestamp"] = str(time.time())
+            metadata_updates["technical_agent_execution_time"] = f"{execution_time:.2f} seconds"
 
-            # 9. 添加消息记录，保持对话历史
+            # 9. 添加本节点的消息记录（messages 通道按追加方式合并）
             new_message = {"role": "assistant", "content": "技术分析已完成"}
-            updated_messages = current_messages + [new_message]
 
             # 记录 Agent执行成功
             total_execution_time = time.time() - agent_start_time
@@ -217,25 +225,25 @@ async def technical_agent(state: AgentState) -> AgentState:
             }, total_execution_time, True)
 
             return {
-                "data": current_data,
-                "messages": updated_messages,
-                "metadata": current_metadata
+                "data": data_updates,
+                "messages": [new_message],
+                "metadata": metadata_updates
             }
 
         except Exception as e:
             logger.error(f"{ERROR_ICON} TechnicalAgent: Error in MCP or agent execution: {e}", exc_info=True)
-            current_data["technical_analysis_error"] = f"Error in MCP or agent execution: {e}"
-            current_data["technical_analysis"] = f"技术分析过程中出现错误: {str(e)}"
-            current_metadata["technical_agent_error"] = str(e)
-            execution_logger.log_agent_complete(agent_name, current_data, time.time() - agent_start_time, False, str(e))
-            return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+            data_updates["technical_analysis_error"] = f"Error in MCP or agent execution: {e}"
+            data_updates["technical_analysis"] = f"技术分析过程中出现错误: {str(e)}"
+            metadata_updates["technical_agent_error"] = str(e)
+            execution_logger.log_agent_complete(agent_name, data_updates, time.time() - agent_start_time, False, str(e))
+            return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
     except Exception as e:
         logger.error(f"{ERROR_ICON} TechnicalAgent: Error during execution: {e}", exc_info=True)
-        current_data["technical_analysis_error"] = f"Error during execution: {e}"
-        current_metadata["technical_agent_error"] = str(e)
-        execution_logger.log_agent_complete(agent_name, current_data, time.time() - agent_start_time, False, str(e))
-        return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+        data_updates["technical_analysis_error"] = f"Error during execution: {e}"
+        metadata_updates["technical_agent_error"] = str(e)
+        execution_logger.log_agent_complete(agent_name, data_updates, time.time() - agent_start_time, False, str(e))
+        return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
 
 # 本地测试函数
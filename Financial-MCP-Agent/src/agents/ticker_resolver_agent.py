@@ -0,0 +1,155 @@
+"""
+TickerResolver Agent: Resolves the A-share stock code for a query that only names the company.
+股票代码解析 Agent：查询中只有公司名称时，在扇出到各分析Agent之前统一解析一次股票代码
+"""
+import os
+import re
+import time
+from typing import Dict, Any, Optional
+
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import HumanMessage
+
+from utils.state_definition import AgentState
+from tools.mcp_client import get_mcp_tools
+from utils.logging_config import setup_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from utils.execution_logger import get_execution_logger
+from utils.llm_cache import get_llm_cache
+from dotenv import load_dotenv
+
+# 从.env文件加载环境变量
+load_dotenv("Financial-MCP-Agent/.env")
+
+logger = setup_logger(__name__)
+
+# Baostock格式的股票代码，例如 sh.600519 / sz.000001
+_BAOSTOCK_CODE_PATTERN = re.compile(r'(sh|sz)\.(\d{6})(?!\d)', re.IGNORECASE)
+
+# 推理型模型在正文前输出的思考过程，提取代码前去除，避免匹配到思考中提到的其他代码
+_REASONING_PATTERN = re.compile(r'<think>.*?</think>', re.DOTALL)
+
+# 比较公司名称时忽略的前缀和空白，例如 "*ST"、"ST"
+_NAME_NOISE_PATTERN = re.compile(r'^\*?ST|\s')
+
+_RESOLVE_PROMPT = """请给出A股上市公司"{company_name}"的股票代码。
+只输出Baostock格式的代码（上交所为 sh.XXXXXX，深交所为 sz.XXXXXX），不要输出其他内容。
+如果无法确定，只输出 UNKNOWN。"""
+
+
+def _parse_code_name(basic_info: str) -> Optional[str]:
+    """从 get_stock_basic_info 返回的Markdown表格中取出 code_name 列的值"""
+    rows = [line.strip().strip("|").split("|")
+            for line in basic_info.splitlines() if line.strip().startswith("|")]
+    if len(rows) < 3:
+        return None
+
+    header = [cell.strip() for cell in rows[0]]
+    if "code_name" not in header:
+        return None
+    # rows[1] 是表头分隔行，rows[2] 是第一行数据
+    data_row = rows[2]
+    column = header.index("code_name")
+    return data_row[column].strip() if column < len(data_row) else None
+
+
+def _names_match(company_name: str, code_name: str) -> bool:
+    """查询中的公司名称与证券简称是否指向同一家公司（允许简称/全称互相包含）"""
+    query_name = _NAME_NOISE_PATTERN.sub("", company_name)
+    listed_name = _NAME_NOISE_PATTERN.sub("", code_name)
+    return bool(query_name and listed_name) and (query_name in listed_name or listed_name in query_name)
+
+
+async def _verify_stock_code(stock_code: str, company_name: str) -> bool:
+    """通过MCP的 get_stock_basic_info 工具确认股票代码存在，且其证券简称与公司名称一致"""
+    mcp_tools = await get_mcp_tools()
+    basic_info_tool = next(
+        (tool for tool in mcp_tools if tool.name == "get_stock_basic_info"), None)
+    if basic_info_tool is None:
+        # 无法确认代码属于该公司时不采用，交由各分析Agent自行查找
+        return False
+
+    result = str(await basic_info_tool.ainvoke({"code": stock_code, "fields": ["code", "code_name"]}))
+    if result.startswith("Error"):
+        return False
+
+    code_name = _parse_code_name(result)
+    if not code_name or not _names_match(company_name, code_name):
+        logger.warning(
+            f"{ERROR_ICON} TickerResolver: {stock_code} is '{code_name}', does not match '{company_name}'")
+        return False
+    return True
+
+
+async def ticker_resolver_agent(state: AgentState) -> AgentState:
+    """
+    根据公司名称解析股票代码，写入 state["data"]["stock_code"]
+
+    解析失败时不写入代码，后续分析Agent按原有方式自行查找
+
+    Args:
+        state: 包含公司名称的当前 Agent状态
+
+    Returns:
+        部分状态更新，成功时包含解析出的 stock_code
+    """
+    logger.info(f"{WAIT_ICON} TickerResolver: Resolving stock code from company name.")
+
+    execution_logger = get_execution_logger()
+    agent_name = "ticker_resolver_agent"
+
+    current_data = state.get("data", {})
+    current_metadata = state.get("metadata", {})
+    company_name = current_data.get("company_name")
+
+    data_updates: Dict[str, Any] = {}
+
+    execution_logger.log_agent_start(agent_name, {"company_name": company_name})
+    agent_start_time = time.time()
+
+    api_key = os.getenv("OPENAI_COMPATIBLE_API_KEY")
+    base_url = os.getenv("OPENAI_COMPATIBLE_BASE_URL")
+    model_name = os.getenv("OPENAI_COMPATIBLE_MODEL")
+
+    if not company_name or not all([api_key, base_url, model_name]):
+        logger.error(f"{ERROR_ICON} TickerResolver: Missing company name or OpenAI environment variables.")
+        execution_logger.log_agent_complete(agent_name, data_updates, 0, False,
+                                            "Missing company name or OpenAI environment variables")
+        return {"data": data_updates, "messages": []}
+
+    stock_code: Optional[str] = None
+    try:
+        llm = ChatOpenAI(
+            model=model_name,
+            api_key=api_key,
+            base_url=base_url,
+            temperature=0,  # 代码解析只需要确定性的输出
+            max_tokens=1024,  # 为推理型模型的思考过程留出空间
+            cache=get_llm_cache(current_metadata.get("llm_cache_namespace"))
+        )
+        prompt = _RESOLVE_PROMPT.format(company_name=company_name)
+        response = await llm.ainvoke([HumanMessage(content=prompt)])
+
+        answer = _REASONING_PATTERN.sub("", str(response.content))
+        code_match = _BAOSTOCK_CODE_PATTERN.search(answer)
+        if code_match:
+            candidate = f"{code_match.group(1).lower()}.{code_match.group(2)}"
+            if await _verify_stock_code(candidate, company_name):
+                stock_code = candidate
+
+    except Exception as e:
+        logger.error(f"{ERROR_ICON} TickerResolver: Error resolving stock code: {e}", exc_info=True)
+        execution_logger.log_agent_complete(
+            agent_name, data_updates, time.time() - agent_start_time, False, str(e))
+        return {"data": data_updates, "messages": []}
+
+    if stock_code:
+        logger.info(f"{SUCCESS_ICON} TickerResolver: {company_name} -> {stock_code}")
+        data_updates["stock_code"] = stock_code
+    else:
+        logger.warning(f"{ERROR_ICON} TickerResolver: Could not resolve stock code for {company_name}")
+
+    execution_logger.log_agent_complete(
+        agent_name, data_updates, time.time() - agent_start_time, stock_code is not None,
+        None if stock_code else "Stock code not resolved")
+
+    return {"data": data_updates, "messages": []}
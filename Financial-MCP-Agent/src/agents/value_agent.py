@@ -17,6 +17,7 @@ from utils.state_definition import AgentState
 from tools.mcp_client import get_mcp_tools
 from utils.logging_config import setup_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
 from utils.execution_logger import get_execution_logger
+from utils.llm_cache import get_llm_cache
 from dotenv import load_dotenv
 
 # 从.env文件加载环境变量
@@ -42,12 +43,16 @@ async def value_agent(state: AgentState) -> AgentState:
     execution_logger = get_execution_logger()
     agent_name = "value_agent"
 
-    # 从状态中提取当前数据、消息和元数据
+    # 从状态中提取当前数据和元数据（只读）
     current_data = state.get("data", {})
-    current_messages = state.get("messages", [])
     current_metadata = state.get("metadata", {})
     user_query = current_data.get("query")
 
+    # 节点只返回自己写入的字段（部分更新），由AgentState的合并规则并入全局状态，
+    # 避免并行的分析Agent各自复制并回写整份data
+    data_updates: Dict[str, Any] = {}
+    metadata_updates: Dict[str, Any] = {}
+
     # 记录 Agent开始执行，包含关键信息
     execution_logger.log_agent_start(agent_name, {
         "user_query": user_query,
@@ -60,13 +65,13 @@ async def value_agent(state: AgentState) -> AgentState:
     if not user_query:
         logger.error(
             f"{ERROR_ICON} ValueAgent: User query is missing in state data.")
-        current_data["value_analysis_error"] = "User query is missing."
+        data_updates["value_analysis_error"] = "User query is missing."
 
         # 记录 Agent执行失败
         execution_logger.log_agent_complete(
-            agent_name, current_data, 0, False, "User query is missing")
+            agent_name, data_updates, 0, False, "User query is missing")
 
-        return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+        return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
     # 记录 Agent开始时间，用于计算执行时长
     agent_start_time = time.time()
@@ -80,9 +85,9 @@ async def value_agent(state: AgentState) -> AgentState:
         # 验证必要的环境变量是否存在
         if not all([api_key, base_url, model_name]):
             logger.error(f"{ERROR_ICON} ValueAgent: Missing OpenAI environment variables.")
-            current_data["value_analysis_error"] = "Missing OpenAI environment variables."
-            execution_logger.log_agent_complete(agent_name, current_data, time.time() - agent_start_time, False, "Missing OpenAI environment variables")
-            return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+            data_updates["value_analysis_error"] = "Missing OpenAI environment variables."
+            execution_logger.log_agent_complete(agent_name, data_updates, time.time() - agent_start_time, False, "Missing OpenAI environment variables")
+            return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
         logger.info(f"{WAIT_ICON} ValueAgent: Creating ChatOpenAI with model {model_name}")
         # 创建LLM实例，设置合适的参数
@@ -91,7 +96,8 @@ async def value_agent(state: AgentState) -> AgentState:
             api_key=api_key,
             base_url=base_url,
             temperature=0.3,  # 较低的温度确保分析的一致性
-            max_tokens=6000   # 增加token数量用于详细分析
+            max_tokens=6000,  # 增加token数量用于详细分析
+            cache=get_llm_cache(current_metadata.get("llm_cache_namespace"))  # 同股票同日复用相同提示词的输出
         )
 
         # 2. 获取MCP工具集
@@ -101,13 +107,13 @@ async def value_agent(state: AgentState) -> AgentState:
             if not mcp_tools:
                 logger.error(
                     f"{ERROR_ICON} ValueAgent: No MCP tools available.")
-                current_data["value_analysis_error"] = "No MCP tools available."
+                data_updates["value_analysis_error"] = "No MCP tools available."
 
                 # 记录 Agent执行失败
-                execution_logger.log_agent_complete(agent_name, current_data, time.time(
+                execution_logger.log_agent_complete(agent_name, data_updates, time.time(
                 ) - agent_start_time, False, "No MCP tools available")
 
-                return {"data": current_data, "messages": current_messages, "metadata": current_metadata}
+                return {"data": data_updates, "messages": [], "metadata": metadata_updates}
 
             logger.info(
                 f"{SUCCESS_ICON} ValueAgent: Successfully loaded {len(mcp_tools)} tools.")
@@ -116,9 +122,11 @@ async def value_agent(state: AgentState) -> AgentState:
             tool_names = [tool.name for tool in mcp_tools]
             logger.info(f"Available tools: {tool_names}")
 
-            # 3. 创建ReAct Agent - 只传入LLM和工具
+            # 3. 创建ReAct Agent - 传入LLM、工具和共享的系统提示词
             logger.info(f"{WAIT_ICON} ValueAgent: Creating ReAct agent...")
-            agent = create_react_agent(llm, mcp_tools)
+            # 共享的系统提示词前缀在各分析Agent间保持一致，便于服务端复用前缀缓存
+            shared_system_prompt = current_data.get("shared_system_prompt")
+            agent = create_react_agent(llm, mcp_tools, prompt=shared_system_prompt)
 
             # 4. 准备输入数据，构建详细的分析请求
             stock_code = current_data.get('stock_code', 'Unknown')
@@ -210,7 +218,8 @@ async def value_agent(state: AgentState) -> AgentState:
             execution_logger.log_llm_interaction(
                 agent_name=agent_name,
                 interaction_type="react_agent",
-                input_messages=[{"role": "user", "content": agent_input}],
+                input_messages=([{"role": "system", "content": shared_system_prompt}] if shared_system_prompt else [])
+                + [{"role": "user", "content": agent_input}],
                 output_content=final_output,
                 model_config=model_config,
                 execution_time=execution_time
@@ -220,14 +229,13 @@ async def value_agent(state: AgentState) -> AgentState:
                 f"{SUCCESS_ICON} ValueAgent: Successfully completed valuation analysis.")
             
             # 8. 更新状态，保存分析结果和元数据
-            current_data["value_analysis"] = final_output
-            current_metadata["value_agent_executed"] = True
-            current_metadata["value_agent_timestamp"] = str(time.time())
-            current_metadata["value_agent_execution_time"] = f"{execution_time:.2f} seconds"
+            data_updates["value_analysis"] = final_output
+            metadata_updates["value_agent_executed"] = True
+            metadata_updates["value_agent_timestamp"] = str(time.time())
+            metadata_updates["value_agent_execution_time"] = f"{execution_time:.2f} seconds"
 
-            # 9. 添加消息记录，保持对话历史
+            # 9. 添加本节点的消息记录（messages 通道按追加方式合并）
             new_message = {"role": "assistant", "content": "估值分析已完成"}
-            updated_messages = current_messages + [new_message]
 
             # 记录 Agent执行成功
             total_execution_time = time.time() - agent_start_time
@@ -239,42 +247,42 @@ async def value_agent(state: AgentState) -> AgentState:
             }, total_execution_time, True)
 
             return {
-                "data": current_data,
-                "messages": updated_messages,
-                "metadata": current_metadata
+                "data": data_updates,
+                "messages": [new_message],
+                "metadata": metadata_updates
             }
 
         except Exception as e:
             logger.error(
                 f"{ERROR_ICON} ValueAgent: Error in MCP or agent execution: {e}", exc_info=True)
-            current_data["value_analysis_error"] = f"Error in MCP or agent execution: {e}"
-            current_data["value_analysis"] = f"估值分析过程中出现错误: {str(e)}"
-            current_metadata["value_agent_error"] = str(e)
+            data_updates["value_analysis_error"] = f"Error in MCP or agent execution: {e}"
+            data_updates["value_analysis"] = f"估值分析过程中出现错误: {str(e)}"
+            metadata_updates["value_agent_error"] = str(e)
 
             # 记录 Agent执行失败
             execution_logger.log_agent_complete(
-                agent_name, current_data, time.time() - agent_start_time, False, str(e))
+                agent_name, data_updates, time.time() - agent_start_time, False, str(e))
 
             return {
-                "data": current_data,
-                "messages": current_messages,
-                "metadata": current_metadata
+                "data": data_updates,
+                "messages": [],
+                "metadata": metadata_updates
             }
 
     except Exception as e:
         logger.error(
             f"{ERROR_ICON} ValueAgent: Error during execution: {e}", exc_info=True)
-        current_data["value_analysis_error"] = f"Error during execution: {e}"
-        current_metadata["value_agent_error"] = str(e)
+        data_updates["value_analysis_error"] = f"Error during execution: {e}"
+        metadata_updates["value_agent_error"] = str(e)
 
         # 记录 Agent执行失败
         execution_logger.log_agent_complete(
-            agent_name, current_data, time.time() - agent_start_time, False, str(e))
+            agent_name, data_updates, time.time() - agent_start_time, False, str(e))
 
         return {
-            "data": current_data,
-            "messages": current_messages,
-            "metadata": current_metadata
+            "data": data_updates,
+            "messages": [],
+            "metadata": metadata_updates
         }
 
 
@@ -2,10 +2,12 @@
 
 import streamlit as st
 import asyncio
+import queue
+import threading
 import time
 import os
-from collections import deque
 from main_refactored import run_analysis_workflow
+from tools.mcp_client import start_mcp_tools_warmup
 
 # --- 页面配置 ---
 st.set_page_config(
@@ -43,13 +45,42 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# --- 进程级资源 ---
+@st.cache_resource
+def get_event_loop():
+    """进程内共享的事件循环，在后台线程常驻运行，使MCP连接等异步资源跨重跑复用"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="analysis-event-loop", daemon=True).start()
+    return loop
+
+
+@st.cache_resource
+def warm_up_mcp_tools():
+    """每个进程只预热一次MCP工具，所有会话共享"""
+    return start_mcp_tools_warmup(get_event_loop())
+
+
+warm_up_mcp_tools()
+
+
+# 状态面板最多保留的消息条数
+STATUS_CAPACITY = 100
+
 # --- 初始化 Session State (保持不变) ---
 if 'running' not in st.session_state:
     st.session_state.running = False
-if 'status_messages' not in st.session_state:
-    st.session_state.status_messages = deque(maxlen=100)
+if 'status_buf' not in st.session_state:
+    # 预分配的环形缓冲区，status_idx 为已写入的消息总数
+    st.session_state.status_buf = [""] * STATUS_CAPACITY
+    st.session_state.status_idx = 0
+if 'status_text' not in st.session_state:
+    st.session_state.status_text = ""
 if 'result' not in st.session_state:
     st.session_state.result = None
+if 'analysis_future' not in st.session_state:
+    st.session_state.analysis_future = None
+if 'status_queue' not in st.session_state:
+    st.session_state.status_queue = None
 
 
 # --- 页面标题和介绍 (保持不变) ---
@@ -88,34 +119,73 @@ analyze_button = st.button("🚀 开始分析", type="primary", use_container_wi
 # --- 分析逻辑和结果展示 ---
 if analyze_button and user_query:
     st.session_state.running = True
-    st.session_state.status_messages.clear()
+    st.session_state.status_idx = 0
+    st.session_state.status_text = ""
     st.session_state.result = None
     st.rerun()
 
+
+def start_analysis(query: str):
+    """将工作流提交到共享事件循环后台执行，状态消息经队列交给状态面板渲染"""
+    status_queue = queue.Queue()
+
+    def status_callback(message: str):
+        status_queue.put(f"`{time.strftime('%H:%M:%S')}` {message}")
+
+    st.session_state.status_queue = status_queue
+    st.session_state.analysis_future = asyncio.run_coroutine_threadsafe(
+        run_analysis_workflow(query, status_callback), get_event_loop())
+
+
+def append_status(message: str):
+    """追加一条状态消息，增量拼接展示文本；仅在旧消息被覆盖时整体重建"""
+    buf = st.session_state.status_buf
+    idx = st.session_state.status_idx
+    buf[idx % STATUS_CAPACITY] = message
+    idx += 1
+    st.session_state.status_idx = idx
+    if idx > STATUS_CAPACITY:
+        # 缓冲区已满，最旧的消息被覆盖；从最旧的位置开始按时间顺序重建
+        oldest = idx % STATUS_CAPACITY
+        st.session_state.status_text = "\n\n".join(buf[oldest:] + buf[:oldest])
+    elif st.session_state.status_text:
+        st.session_state.status_text += f"\n\n{message}"
+    else:
+        st.session_state.status_text = message
+
+
+@st.fragment(run_every=0.5)
+def render_status():
+    """定时局部刷新分析进程面板，工作流结束后触发整页重跑以展示结果"""
+    status_queue = st.session_state.status_queue
+    while True:
+        try:
+            append_status(status_queue.get_nowait())
+        except queue.Empty:
+            break
+    st.markdown(st.session_state.status_text)
+
+    future = st.session_state.analysis_future
+    if future.done() and status_queue.empty():
+        try:
+            st.session_state.result = future.result()
+        except Exception as e:
+            st.session_state.result = {"success": False, "error": "应用发生严重错误", "details": str(e)}
+        st.session_state.running = False
+        st.session_state.analysis_future = None
+        st.rerun()
+
+
 if st.session_state.running:
+    if st.session_state.analysis_future is None:
+        start_analysis(user_query)
+
     col1, col2 = st.columns([1, 1.2])
 
     with col1:
         st.subheader("⚙️ 分析进程")
         with st.container(height=520, border=False):
-            status_placeholder = st.empty()
-            
-            def status_callback(message: str):
-                st.session_state.status_messages.append(f"`{time.strftime('%H:%M:%S')}` {message}")
-                status_text = "\n\n".join(st.session_state.status_messages)
-                status_placeholder.markdown(status_text)
-            
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                result = loop.run_until_complete(run_analysis_workflow(user_query, status_callback))
-                st.session_state.result = result
-                st.session_state.running = False
-                st.rerun()
-            except Exception as e:
-                st.session_state.result = {"success": False, "error": "应用发生严重错误", "details": str(e)}
-                st.session_state.running = False
-                st.rerun()
+            render_status()
     with col2:
         st.subheader("📄 分析报告")
         with st.spinner("⏳ 智能体正在工作中，报告生成中..."):
@@ -144,8 +214,7 @@ if st.session_state.result:
         with col1:
             st.subheader("⚙️ 分析进程")
             with st.container(height=520, border=False):
-                status_text = "\n\n".join(st.session_state.status_messages)
-                st.markdown(status_text)
+                st.markdown(st.session_state.status_text)
         
         with col2:
             st.subheader("📄 分析报告")
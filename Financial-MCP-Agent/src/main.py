@@ -39,7 +39,7 @@ logging.getLogger("urllib3").setLevel(logging.ERROR)
 # 日志和状态管理相关导入
 from utils.logging_config import setup_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
 from utils.state_definition import AgentState
-from utils.execution_logger import initialize_execution_logger, finalize_execution_logger, get_execution_logger
+from utils.execution_logger import initialize_execution_logger, finalize_execution_logger
 
 # 智能体模块导入 - 五个核心分析智能体
 from agents.summary_agent import summary_agent      # 总结智能体：整合所有分析结果
@@ -525,7 +525,7 @@ async def main():
 
         # 记录错误并完成执行日志
         finalize_execution_logger(success=False, error=str(e))
-        print(f"{ERROR_ICON} 错误日志已保存到: {get_execution_logger().execution_dir}")
+        print(f"{ERROR_ICON} 错误日志已保存到: {execution_logger.execution_dir}")
 
 
 # ============================================================================
@@ -17,11 +17,15 @@
 import os
 import sys
 import logging
-import re
 import asyncio
+import hashlib
+import sqlite3
+from collections import OrderedDict
 from datetime import datetime
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
+from langgraph.checkpoint.memory import InMemorySaver
 
 # 确保在项目根目录运行，以便正确导入模块
 # 如果你的目录结构是 project/main.py, project/agents/...
@@ -46,11 +50,15 @@ try:
     from utils.logging_config import setup_logger, SUCCESS_ICON, ERROR_ICON
     from utils.state_definition import AgentState
     from utils.execution_logger import initialize_execution_logger, finalize_execution_logger
+    from utils.agent_cache import AgentResultCache
+    from utils.query_parser import extract_stock_info
+    from tools.mcp_client import tool_call_scope
     from agents.summary_agent import summary_agent
     from agents.value_agent import value_agent
     from agents.technical_agent import technical_agent
     from agents.fundamental_agent import fundamental_agent
     from agents.news_agent import news_agent
+    from agents.ticker_resolver_agent import ticker_resolver_agent
 except ImportError as e:
     print(f"模块导入错误: {e}")
     print("请确保你在项目的根目录下运行，并且所有依赖都已安装。")
@@ -63,6 +71,223 @@ load_dotenv(override=True)
 logger = setup_logger(__name__)
 
 
+# ============================================================================
+# 工作流拓扑
+# ============================================================================
+
+# 并行执行的分析师节点，全部完成后才会进入 summarizer
+_ANALYST_NODES = ("fundamental_analyst", "technical_analyst", "value_analyst", "news_analyst")
+
+
+# 依赖股票代码的分析师。查询中只有公司名称时，它们要等 ticker_resolver 解析出代码后再启动
+_CODE_DEPENDENT_ANALYST_NODES = ("fundamental_analyst", "technical_analyst", "value_analyst")
+
+
+def _fan_out_to_analysts(state: AgentState):
+    """将同一份状态分发给所有分析师节点，使其在同一超步内并发运行"""
+    return [Send(node, state) for node in _ANALYST_NODES]
+
+
+def _fan_out_name_only(state: AgentState):
+    """只有公司名称时：新闻分析只需要公司名称，与股票代码解析并行启动"""
+    return [Send("ticker_resolver", state), Send("news_analyst", state)]
+
+
+def _fan_out_after_resolve(state: AgentState):
+    """股票代码解析完成后，将带有代码的状态分发给其余分析师"""
+    return [Send(node, state) for node in _CODE_DEPENDENT_ANALYST_NODES]
+
+
+# ============================================================================
+# 共享系统提示词
+# ============================================================================
+
+# 四个分析Agent共用的系统提示词前缀。同一次分析中各Agent请求的开头完全一致，
+# 可命中LLM服务端的前缀缓存（KV cache），只有其后的分析任务部分各不相同。
+# 前缀只包含扇出前就已确定的信息；股票代码可能在扇出后才解析出来，由各Agent的分析任务给出
+_SHARED_SYSTEM_PROMPT = """你是一名专业的A股金融分析师，隶属于一个多智能体分析团队。团队成员分别负责基本面分析、技术分析、估值分析和新闻分析，各自的结果最终会被整合成一份综合投资分析报告。
+
+分析对象：{analysis_target}（股票代码见分析任务）
+分析基准日期：{current_date}
+
+工作要求：
+- 使用可用的工具获取实际数据进行分析，而不是基于假设
+- 基于分析基准日期判断数据的时效性，正确区分"最新"、"近期"和"历史"数据
+- 只完成分配给你的分析维度，输出结构清晰、有数据支撑的分析结论"""
+
+
+def _build_shared_system_prompt(data: dict) -> str:
+    """根据查询中的公司名称（没有时使用股票代码）和分析日期生成共享系统提示词"""
+    return _SHARED_SYSTEM_PROMPT.format(
+        analysis_target=data.get("company_name") or data.get("stock_code", "Unknown"),
+        current_date=data.get("current_date")
+    )
+
+
+# ============================================================================
+# 分析结果缓存
+# ============================================================================
+
+# 同一股票同一天的分析结果在TTL内直接复用，避免重复的MCP调用和LLM推理
+_result_cache = AgentResultCache(
+    os.path.join("logs", "agent_cache.db"),
+    ttl=int(os.getenv("AGENT_CACHE_TTL", "3600"))
+)
+
+
+def _with_result_cache(agent_name: str, result_key: str, agent_fn):
+    """
+    为分析Agent节点包装一层结果缓存
+
+    :param agent_name: Agent名称，作为缓存键的一部分。
+    :param result_key: Agent写入 state["data"] 的分析结果字段。
+    :param agent_fn: 原始的Agent节点函数。
+    """
+    async def cached_agent(state: AgentState):
+        current_data = state.get("data", {})
+        stock_key = current_data.get("stock_code") or current_data.get("company_name")
+        cache_key = AgentResultCache.make_key(stock_key, current_data.get("current_date"), agent_name)
+
+        # SQLite读写放到线程中执行，避免阻塞事件循环；缓存故障时直接执行Agent
+        try:
+            cached_result = await asyncio.to_thread(_result_cache.get, cache_key)
+        except sqlite3.Error as e:
+            logger.warning(f"{ERROR_ICON} {agent_name}: 读取分析结果缓存失败，跳过缓存: {e}")
+            cached_result = None
+        if cached_result is not None:
+            logger.info(f"{SUCCESS_ICON} {agent_name}: 命中分析结果缓存 ({stock_key})")
+            return {
+                "data": {result_key: cached_result},
+                "metadata": {f"{agent_name}_cache_hit": True}
+            }
+
+        result = await agent_fn(state)
+        result_data = result.get("data", {})
+        # 只缓存成功的分析结果
+        if result_key in result_data and f"{result_key}_error" not in result_data:
+            try:
+                await asyncio.to_thread(_result_cache.set, cache_key, result_data[result_key])
+            except sqlite3.Error as e:
+                logger.warning(f"{ERROR_ICON} {agent_name}: 写入分析结果缓存失败: {e}")
+        return result
+
+    return cached_agent
+
+
+# ============================================================================
+# 工作流构建
+# ============================================================================
+
+# 每个节点执行后保存状态快照，同一股票同一天的重复请求可复用或从中断处继续
+_CHECKPOINTER = InMemorySaver()
+
+# 快照中表示某个节点执行失败的字段，存在时不复用该快照
+_FAILURE_KEYS = ("fundamental_analysis_error", "technical_analysis_error",
+                 "value_analysis_error", "news_analysis_error", "summary_error")
+
+# 检查点中最多保留的分析线程数，超出后淘汰最久未使用的线程
+_MAX_CHECKPOINT_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "64"))
+# 已写入检查点的线程 -> 分析日期，按最近使用排序
+_checkpoint_threads: "OrderedDict[str, str]" = OrderedDict()
+# 正在执行的检查点线程 -> 执行该线程的Task。多个会话同时提交同一查询时共享一次执行
+_inflight_runs = {}
+
+
+def _build_workflow(resolve_ticker: bool = False):
+    """
+    构建并编译LangGraph工作流。拓扑是静态的，模块加载时编译一次即可复用
+
+    :param resolve_ticker: 为只有公司名称的查询构建，扇出前先用 ticker_resolver 统一解析股票代码，
+                           避免每个分析师各自查找代码。
+    """
+    workflow = StateGraph(AgentState)
+    workflow.add_node("start_node", lambda state: state)
+    workflow.add_node("fundamental_analyst",
+                      _with_result_cache("fundamental_agent", "fundamental_analysis", fundamental_agent))
+    workflow.add_node("technical_analyst",
+                      _with_result_cache("technical_agent", "technical_analysis", technical_agent))
+    workflow.add_node("value_analyst",
+                      _with_result_cache("value_agent", "value_analysis", value_agent))
+    workflow.add_node("news_analyst",
+                      _with_result_cache("news_agent", "news_analysis", news_agent))
+    workflow.add_node("summarizer", summary_agent)
+    workflow.set_entry_point("start_node")
+    if resolve_ticker:
+        workflow.add_node("ticker_resolver", ticker_resolver_agent)
+        workflow.add_conditional_edges("start_node", _fan_out_name_only, ["ticker_resolver", "news_analyst"])
+        workflow.add_conditional_edges("ticker_resolver", _fan_out_after_resolve,
+                                       list(_CODE_DEPENDENT_ANALYST_NODES))
+    else:
+        # 通过 Send API 显式扇出，四个分析师作为独立分支并发执行
+        workflow.add_conditional_edges("start_node", _fan_out_to_analysts, list(_ANALYST_NODES))
+    # 汇合屏障：四个分析师全部写入后 summarizer 才会触发
+    workflow.add_edge(list(_ANALYST_NODES), "summarizer")
+    workflow.add_edge("summarizer", END)
+    return workflow.compile(checkpointer=_CHECKPOINTER)
+
+
+# 查询中已有股票代码（无论是否带公司名称）时使用的工作流
+_APP = _build_workflow()
+# 查询中只有公司名称时使用的工作流
+_APP_NAME_ONLY = _build_workflow(resolve_ticker=True)
+
+
+def _prune_checkpoints(thread_id: str, current_date: str):
+    """
+    登记本次使用的检查点线程，并清理不会再命中的线程：
+    非当天的线程，以及超出数量上限的最久未使用线程。正在执行的线程不会被清理。
+    """
+    _checkpoint_threads[thread_id] = current_date
+    _checkpoint_threads.move_to_end(thread_id)
+
+    stale_threads = [tid for tid, analysis_date in _checkpoint_threads.items()
+                     if analysis_date != current_date and tid not in _inflight_runs]
+    overflow = len(_checkpoint_threads) - len(stale_threads) - _MAX_CHECKPOINT_THREADS
+    for tid in _checkpoint_threads:
+        if overflow <= 0:
+            break
+        if tid not in stale_threads and tid != thread_id and tid not in _inflight_runs:
+            stale_threads.append(tid)
+            overflow -= 1
+
+    for tid in stale_threads:
+        _CHECKPOINTER.delete_thread(tid)
+        del _checkpoint_threads[tid]
+
+
+def _is_snapshot_fresh(data: dict) -> bool:
+    """快照是否仍在分析结果缓存的TTL内（以分析开始时间计算）"""
+    try:
+        started_at = datetime.fromisoformat(data["analysis_timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (datetime.now() - started_at).total_seconds() <= _result_cache.ttl
+
+
+async def _execute_thread(app, initial_state: AgentState, config: dict, update_status):
+    """在检查点线程上执行工作流：中断的线程从断点继续，完整且未过期的结果直接复用，否则重新执行"""
+    thread_id = config["configurable"]["thread_id"]
+    snapshot = await app.aget_state(config)
+    previous_data = snapshot.values.get("data", {}) if snapshot.values else {}
+
+    # 本次执行内各Agent的相同MCP工具调用只发起一次
+    with tool_call_scope():
+        if snapshot.next:
+            # 上次执行中断（当前没有正在执行的任务），只重新执行未完成的节点
+            update_status("♻️ 检测到该查询今日未完成的分析，从中断处继续执行...")
+            return await app.ainvoke(None, config)
+
+        if ("final_report" in previous_data and _is_snapshot_fresh(previous_data)
+                and not any(key in previous_data for key in _FAILURE_KEYS)):
+            update_status("♻️ 该查询今日已有完整的分析结果，直接复用。")
+            return snapshot.values
+
+        if snapshot.values:
+            # 上次结果已过期或包含失败的分析，清空旧快照避免旧字段被合并进新状态
+            _CHECKPOINTER.delete_thread(thread_id)
+        return await app.ainvoke(initial_state, config)
+
+
 # ============================================================================
 # 核心工作流函数
 # ============================================================================
@@ -89,91 +314,15 @@ async def run_analysis_workflow(user_query: str, status_callback=None):
     update_status(f"✅ 执行日志系统已初始化，目录: {execution_logger.execution_dir}")
 
     try:
-        # 1. 定义LangGraph工作流
-        workflow = StateGraph(AgentState)
-        workflow.add_node("start_node", lambda state: state)
-        workflow.add_node("fundamental_analyst", fundamental_agent)
-        workflow.add_node("technical_analyst", technical_agent)
-        workflow.add_node("value_analyst", value_agent)
-        workflow.add_node("news_analyst", news_agent)
-        workflow.add_node("summarizer", summary_agent)
-        workflow.set_entry_point("start_node")
-        workflow.add_edge("start_node", "fundamental_analyst")
-        workflow.add_edge("start_node", "technical_analyst")
-        workflow.add_edge("start_node", "value_analyst")
-        workflow.add_edge("start_node", "news_analyst")
-        workflow.add_edge("fundamental_analyst", "summarizer")
-        workflow.add_edge("technical_analyst", "summarizer")
-        workflow.add_edge("value_analyst", "summarizer")
-        workflow.add_edge("news_analyst", "summarizer")
-        workflow.add_edge("summarizer", END)
-        app = workflow.compile()
-        update_status("✅ LangGraph 工作流构建完成。")
-
-        # 2. 自然语言处理和股票信息提取
-        # (将原始文件中的 extract_stock_info 函数完整地复制到这里)
-        def extract_stock_info(query):
-            """精确提取股票代码和公司名称"""
-            stock_code = None
-            company_name = None
-            patterns = [
-                r'请帮我分析一下\s*([^（(]+?)\s*[（(](\d{5,6})[)）]',
-                r'分析一下\s*([^（(]+?)\s*[（(](\d{5,6})[)）]',
-                r'分析\s*([^（(]+?)\s*[（(](\d{5,6})[)）]',
-                r'分析\s*[（(](\d{5,6})[)）]\s*([^）)]+)',
-                r'帮我看看\s*[（(](\d{5,6})[)）]\s*([^）)]+?)(?:\s*这只|\s*这个)?\s*股票',
-                r'我想了解一下\s*([^（(]+?)\s*[（(](\d{5,6})[)）]',
-                r'帮我看看\s*([^（(]+?)\s*[（(](\d{5,6})[)）]',
-                r'^([^（(]+?)\s*[（(](\d{5,6})[)）]'
-            ]
-            for pattern in patterns:
-                match = re.search(pattern, query)
-                if match:
-                    if len(match.groups()) == 2:
-                        if match.group(1).isdigit():
-                            stock_code, company_name = match.group(1), match.group(2).strip()
-                        else:
-                            company_name, stock_code = match.group(1).strip(), match.group(2)
-                        return company_name, stock_code
-            
-            # 如果没有匹配到带括号的组合，则分别匹配公司名和代码
-            # 优先匹配代码
-            code_match = re.search(r'\b(\d{5,6})\b', query)
-            if code_match:
-                stock_code = code_match.group(1)
-
-            # 匹配公司名称 (更通用的模式)
-            name_patterns = [
-                r'分析(?:一下)?\s*([^0-9（）()\s]+)',
-                r'([^0-9（）()\s]+)\s*(?:这只|这个|的)?\s*股票',
-                r'(?:了解|看看|给我分析)一下\s*([^0-9（）()\s]+)',
-                r'([^0-9（）()\s]+?)\s*的\s*(?:财务|估值|风险|价值|基本面)',
-            ]
-            for pattern in name_patterns:
-                name_match = re.search(pattern, query)
-                if name_match:
-                    potential_name = name_match.group(1).strip()
-                    # 避免匹配到 "股票" "价值" 等词
-                    if len(potential_name) >= 2 and potential_name not in ["股票", "价值", "公司"]:
-                         company_name = potential_name
-                         break # 找到一个就停止
-
-            if company_name:
-                stop_words = ['的', '这个', '这只', '一下', '看看', '了解', '分析', '帮我', '我想', '给我']
-                for word in stop_words:
-                    company_name = company_name.replace(word, '').strip()
-                if len(company_name) < 2: company_name = None
-
-            return company_name, stock_code
-
+        # 1. 自然语言处理和股票信息提取
         company_name, stock_code = extract_stock_info(user_query)
         update_status(f"🔎 从查询中提取到信息 - 公司: {company_name or '未识别'}, 代码: {stock_code or '未识别'}")
 
-        # 3. 时间信息处理
+        # 2. 时间信息处理
         current_datetime = datetime.now()
         current_date_en = current_datetime.strftime("%Y-%m-%d")
 
-        # 4. 准备初始状态数据
+        # 3. 准备初始状态数据
         initial_data = {
             "query": user_query,
             "current_date": current_date_en,
@@ -192,25 +341,57 @@ async def run_analysis_workflow(user_query: str, status_callback=None):
         if not company_name and not stock_code:
             raise ValueError("无法从您的查询中识别出有效的公司名称或股票代码，请提供更明确的信息。")
 
-        initial_state = AgentState(messages=[], data=initial_data, metadata={})
+        initial_data["shared_system_prompt"] = _build_shared_system_prompt(initial_data)
+
+        # "股票:日期" 标识同一股票当天的分析，用于隔离LLM响应缓存和工作流检查点
+        analysis_key = f"{initial_data.get('stock_code') or company_name}:{current_date_en}"
+        initial_state = AgentState(messages=[], data=initial_data,
+                                   metadata={"llm_cache_namespace": analysis_key})
 
-        # 5. 执行工作流
+        # 4. 执行工作流
         update_status("\n🚀 **开始执行分析任务...**")
+        # 按查询中是否包含股票代码选择预先编译好的工作流
+        app = _APP if stock_code else _APP_NAME_ONLY
+        if not stock_code:
+            update_status("   - 🔎 查询中没有股票代码，先根据公司名称解析代码...")
         update_status("   - 📊 基本面分析 Agent 启动...")
         update_status("   - 📈 技术面分析 Agent 启动...")
         update_status("   - 💰 估值分析 Agent 启动...")
         update_status("   - 📰 新闻分析 Agent 启动...")
         update_status("\n*分析过程可能需要1-2分钟，请耐心等待...*")
 
-        final_state = await app.ainvoke(initial_state)
+        # 检查点线程按 "股票:日期" 加查询内容区分：最终报告依赖用户的具体问题，
+        # 只有同一股票、同一天、相同查询的请求才复用报告或共享执行；各分析师的结果仍通过结果缓存共享
+        normalized_query = " ".join(user_query.split())
+        query_digest = hashlib.sha1(normalized_query.encode("utf-8")).hexdigest()[:16]
+        thread_id = f"{analysis_key}:{query_digest}"
+        config = {"configurable": {"thread_id": thread_id}}
+        run_task = _inflight_runs.get(thread_id)
+        if run_task is not None:
+            # 其他会话正在执行相同的查询，等待其结果而不是在同一线程上重复执行
+            update_status("⏳ 相同查询的分析正在进行中，等待其完成...")
+        else:
+            _prune_checkpoints(thread_id, current_date_en)
+            run_task = asyncio.ensure_future(_execute_thread(app, initial_state, config, update_status))
+            _inflight_runs[thread_id] = run_task
+
+            def _release_thread(done_task, thread_id=thread_id):
+                if _inflight_runs.get(thread_id) is done_task:
+                    del _inflight_runs[thread_id]
+
+            run_task.add_done_callback(_release_thread)
+
+        # shield 防止某个会话被取消时连带取消其他会话等待的执行
+        final_state = await asyncio.shield(run_task)
         update_status("\n✅ **所有分析模块执行完毕！**")
         update_status("   - 🤖 总结 Agent 正在整合报告...")
 
-        # 6. 结果处理和报告生成
+        # 5. 结果处理和报告生成
         if final_state and final_state.get("data") and "final_report" in final_state["data"]:
             report_path = final_state['data'].get('report_path')
             execution_logger.log_final_report(final_state["data"]["final_report"], report_path)
-            finalize_execution_logger(success=True)
+            # 完成日志需要等待写盘并生成摘要，放到线程中执行，避免阻塞共享事件循环上的其他会话
+            await asyncio.to_thread(finalize_execution_logger, success=True, execution_logger=execution_logger)
             update_status(f"🎉 **报告生成成功！**")
             
             return {
@@ -224,7 +405,8 @@ async def run_analysis_workflow(user_query: str, status_callback=None):
 
     except Exception as e:
         logger.error(f"工作流执行期间发生错误: {e}", exc_info=True)
-        finalize_execution_logger(success=False, error=str(e))
+        await asyncio.to_thread(finalize_execution_logger, success=False, error=str(e),
+                                execution_logger=execution_logger)
         update_status(f"❌ **发生错误**: {e}")
         return {
             "success": False,
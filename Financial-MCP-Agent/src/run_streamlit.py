@@ -1,12 +1,37 @@
 import sys
 import os
+import ctypes.util
 from streamlit.web import cli as stcli
 
+
+def _preload_mimalloc():
+    """
+    如果系统中安装了 mimalloc（例如 apt install libmimalloc2.0），
+    通过 LD_PRELOAD 重新启动当前进程，让Streamlit进程使用mimalloc作为内存分配器。
+    LD_PRELOAD 只在进程启动时生效，因此需要 exec 自身。
+    """
+    if not sys.platform.startswith("linux") or os.getenv("DISABLE_MIMALLOC"):
+        return
+    if "mimalloc" in os.environ.get("LD_PRELOAD", ""):
+        return  # 已经在 mimalloc 下运行
+
+    mimalloc_lib = ctypes.util.find_library("mimalloc")
+    if not mimalloc_lib:
+        return
+
+    env = dict(os.environ)
+    env["LD_PRELOAD"] = " ".join(filter(None, [mimalloc_lib, env.get("LD_PRELOAD")]))
+    os.execve(sys.executable, [sys.executable] + sys.argv, env)
+
+
 if __name__ == '__main__':
     # 如果是打包后的环境
     if getattr(sys, 'frozen', False):
         # 设置工作目录为可执行文件所在目录
         os.chdir(os.path.dirname(sys.executable))
+    else:
+        # 源码运行时，如有可用的 mimalloc 则切换到 mimalloc 分配器
+        _preload_mimalloc()
     
     # 获取 app.py 的路径
     if getattr(sys, 'frozen', False):
@@ -2,13 +2,40 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from utils.logging_config import setup_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
 from tools.mcp_config import SERVER_CONFIGS
 import asyncio  # 异步操作所需，如get_tools
+import contextlib
+import contextvars
 import json
+import os
+import time
+import httpx
 import streamlit as st
 
 logger = setup_logger(__name__)
 
 _mcp_client_instance = None
 _mcp_tools = None
+_mcp_tools_lock = None
+_mcp_tools_lock_loop = None
+_warmup_future = None
+
+# 工具加载失败后的冷却时间（秒）。冷却期内的调用直接得到空工具列表，
+# 避免同一次分析中的多个Agent依次重复连接并各自等待超时；冷却期过后的请求才会重试
+_MCP_RETRY_INTERVAL = float(os.getenv("MCP_RETRY_INTERVAL", "30"))
+_mcp_last_failure = None
+
+# 同时发往MCP服务器的最大工具调用数，避免并行的分析Agent压垮服务端
+_MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "8"))
+_mcp_call_semaphore = None
+_mcp_call_semaphore_loop = None
+
+# 所有MCP会话共享的HTTP连接池（绑定到创建它的事件循环），复用TCP/TLS连接
+_MCP_HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=60)
+_MCP_HTTP_TIMEOUT = httpx.Timeout(30.0)
+_shared_http_transport = None
+_shared_http_transport_loop = None
+
+# 当前工作流范围内的MCP工具调用，键为 (工具名, 参数JSON)，值为执行该调用的Task
+_tool_call_registry = contextvars.ContextVar("mcp_tool_call_registry", default=None)
 
 
 def print_tool_details(tools):
@@ -30,16 +57,169 @@ def print_tool_details(tools):
         logger.info("     " + "-" * 50)
 
 
+@contextlib.contextmanager
+def tool_call_scope():
+    """
+    在一次工作流执行范围内合并重复的MCP工具调用。
+    范围内多个Agent以相同参数调用同一工具时，只会向服务器发起一次请求。
+    """
+    token = _tool_call_registry.set({})
+    try:
+        yield
+    finally:
+        _tool_call_registry.reset(token)
+
+
+def _get_call_semaphore():
+    """获取绑定到当前事件循环的工具调用并发限制"""
+    global _mcp_call_semaphore, _mcp_call_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _mcp_call_semaphore is None or _mcp_call_semaphore_loop is not loop:
+        _mcp_call_semaphore = asyncio.Semaphore(_MCP_MAX_CONCURRENCY)
+        _mcp_call_semaphore_loop = loop
+    return _mcp_call_semaphore
+
+
+async def _call_with_limit(call_tool, arguments):
+    """在并发限制内执行一次实际的MCP工具调用"""
+    async with _get_call_semaphore():
+        return await call_tool(**arguments)
+
+
+def _coalesce_tool_calls(tool):
+    """包装MCP工具的协程，使同一范围内相同参数的调用共享一次请求，且实际请求受并发限制"""
+    call_tool = tool.coroutine
+
+    async def coalesced_call_tool(**arguments):
+        registry = _tool_call_registry.get()
+        if registry is None:
+            return await _call_with_limit(call_tool, arguments)
+
+        key = (tool.name, json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str))
+        task = registry.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_call_with_limit(call_tool, arguments))
+            registry[key] = task
+
+            def _discard_failed(done_task):
+                # 失败的调用不保留，允许后续重试
+                if done_task.cancelled() or done_task.exception() is not None:
+                    registry.pop(key, None)
+
+            task.add_done_callback(_discard_failed)
+        else:
+            logger.info(f"{SUCCESS_ICON} Reusing MCP tool call: {tool.name}({key[1]})")
+
+        # shield 防止某个调用方被取消时连带取消其他调用方共享的请求
+        return await asyncio.shield(task)
+
+    return tool.model_copy(update={"coroutine": coalesced_call_tool})
+
+
+class _NonClosingTransport(httpx.AsyncBaseTransport):
+    """转发请求到共享连接池；每个MCP会话结束时关闭的只是这层包装，连接池保持存活"""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    async def handle_async_request(self, request):
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+def _get_shared_http_transport():
+    """获取绑定到当前事件循环的共享HTTP连接池"""
+    global _shared_http_transport, _shared_http_transport_loop
+    loop = asyncio.get_running_loop()
+    if _shared_http_transport is None or _shared_http_transport_loop is not loop:
+        _shared_http_transport = httpx.AsyncHTTPTransport(limits=_MCP_HTTP_LIMITS)
+        _shared_http_transport_loop = loop
+    return _shared_http_transport
+
+
+def _create_pooled_http_client(headers=None, timeout=None, auth=None):
+    """
+    MCP会话使用的httpx客户端工厂。
+    langchain-mcp-adapters 每次工具调用都会新建会话和客户端，这里让它们共用同一个
+    keep-alive连接池，避免每次调用都重新进行TCP和TLS握手。
+    其余行为与 mcp 默认的 create_mcp_http_client 保持一致。
+    """
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=timeout if timeout is not None else _MCP_HTTP_TIMEOUT,
+        auth=auth,
+        follow_redirects=True,
+        transport=_NonClosingTransport(_get_shared_http_transport()),
+    )
+
+
+def _in_failure_cooldown():
+    """最近一次工具加载失败是否仍在冷却期内"""
+    return _mcp_last_failure is not None and time.monotonic() - _mcp_last_failure < _MCP_RETRY_INTERVAL
+
+
+def _get_tools_lock():
+    """获取绑定到当前事件循环的工具加载锁"""
+    global _mcp_tools_lock, _mcp_tools_lock_loop
+    loop = asyncio.get_running_loop()
+    if _mcp_tools_lock is None or _mcp_tools_lock_loop is not loop:
+        _mcp_tools_lock = asyncio.Lock()
+        _mcp_tools_lock_loop = loop
+    return _mcp_tools_lock
+
+
+def start_mcp_tools_warmup(loop):
+    """
+    预先加载MCP工具，使首个分析请求无需等待握手和工具列表获取。
+    同一进程内重复调用只会启动一次预热。
+
+    Args:
+        loop: 后续执行分析工作流的常驻事件循环，预热在该循环上执行
+    """
+    global _warmup_future
+    if _warmup_future is not None or _mcp_tools is not None:
+        return _warmup_future
+
+    logger.info(f"{WAIT_ICON} Warming up MCP tools on shared event loop...")
+    _warmup_future = asyncio.run_coroutine_threadsafe(_load_mcp_tools(), loop)
+    return _warmup_future
+
+
 async def get_mcp_tools():
     """
     初始化MultiServerMCPClient，并从云端的 a_share_mcp_v2 服务器获取工具。
     """
-    global _mcp_client_instance, _mcp_tools
-
     if _mcp_tools is not None:
         logger.info(f"{SUCCESS_ICON} Returning cached MCP tools.")
         return _mcp_tools
 
+    # 后台预热已启动时，等待其结果而不是重复发起连接
+    if _warmup_future is not None:
+        await asyncio.wrap_future(_warmup_future)
+        if _mcp_tools is not None:
+            return _mcp_tools
+
+    # 并发的分析Agent同时首次调用时，只允许一个协程执行加载
+    async with _get_tools_lock():
+        if _mcp_tools is not None:
+            logger.info(f"{SUCCESS_ICON} Returning cached MCP tools.")
+            return _mcp_tools
+        if _in_failure_cooldown():
+            logger.warning(f"{ERROR_ICON} MCP tools failed to load recently, skipping retry for now.")
+            return []
+        return await _load_mcp_tools()
+
+
+async def _load_mcp_tools():
+    """
+    连接MCP服务器并加载工具列表，成功时结果缓存在模块级变量中。
+    加载失败或未获取到工具时不缓存（_mcp_tools 保持为None），只记录失败时间，
+    冷却期过后的请求会重新尝试，避免启动预热时的临时网络故障让之后所有分析都拿不到工具。
+    """
+    global _mcp_client_instance, _mcp_tools, _mcp_last_failure
+
     # --- 关键修改：动态配置服务器 URL ---
     try:
         # 1. 从 Streamlit Secrets 获取服务器的真实 URL
@@ -48,14 +228,18 @@ async def get_mcp_tools():
             raise ValueError("URL is empty.")
     except (KeyError, ValueError):
         logger.error(f"{ERROR_ICON} 'mcp_server_url' not found or is empty in Streamlit Secrets!")
-        _mcp_tools = []
+        _mcp_last_failure = time.monotonic()
         return []
 
-    # 2. 复制并更新配置
-    # 创建一个配置的深拷贝以避免修改原始导入的字典
-    import copy
-    current_configs = copy.deepcopy(SERVER_CONFIGS)
-    current_configs["a_share_mcp_v2"]["url"] = mcp_server_url
+    # 2. 基于模板生成本次使用的配置
+    # 配置只有两层，浅合并即可，原始导入的字典保持不变
+    current_configs = {
+        "a_share_mcp_v2": {
+            **SERVER_CONFIGS["a_share_mcp_v2"],
+            "url": mcp_server_url,
+            "httpx_client_factory": _create_pooled_http_client,
+        }
+    }
 
     logger.info(f"{WAIT_ICON} Initializing MultiServerMCPClient with remote config: {current_configs}")
     # --- 修改结束 ---
@@ -69,16 +253,17 @@ async def get_mcp_tools():
 
         if not loaded_tools:
             logger.warning(f"{ERROR_ICON} No tools loaded from MCP server. Check server logs and URL.")
-            _mcp_tools = []
+            _mcp_last_failure = time.monotonic()
             return []
 
-        _mcp_tools = loaded_tools
+        _mcp_tools = [_coalesce_tool_calls(tool) for tool in loaded_tools]
+        _mcp_last_failure = None
         logger.info(f"{SUCCESS_ICON} Successfully loaded {len(_mcp_tools)} tools via HTTP.")
         return _mcp_tools
 
     except Exception as e:
         logger.error(f"{ERROR_ICON} Failed to initialize MCP client or load tools via HTTP: {e}", exc_info=True)
-        _mcp_tools = []
+        _mcp_last_failure = time.monotonic()
         return []
 
 
@@ -94,8 +279,16 @@ async def close_mcp_client_sessions():
             logger.info(
                 f"{SUCCESS_ICON} MCP client sessions (if any were persistently open) assumed closed or managed by library.")
             _mcp_client_instance = None   # 允许重新初始化
-            global _mcp_tools
+            global _mcp_tools, _warmup_future, _shared_http_transport, _shared_http_transport_loop, _mcp_last_failure
             _mcp_tools = None
+            _warmup_future = None
+            _mcp_last_failure = None
+
+            # 关闭当前事件循环上的共享连接池
+            if _shared_http_transport is not None and _shared_http_transport_loop is asyncio.get_running_loop():
+                await _shared_http_transport.aclose()
+            _shared_http_transport = None
+            _shared_http_transport_loop = None
         except Exception as e:
             logger.error(
                 f"{ERROR_ICON} Error during MCP client session cleanup: {e}", exc_info=True)
@@ -0,0 +1,104 @@
+"""
+分析结果缓存 - 以 (股票代码, 分析日期, Agent名称) 为键缓存各分析Agent的输出
+使用SQLite持久化，支持TTL过期和LFU（最少使用）淘汰
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+class AgentResultCache:
+    """分析Agent结果缓存"""
+
+    def __init__(self, db_path: str, ttl: int = 3600, max_entries: int = 512):
+        """
+        初始化分析结果缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+            ttl: 缓存有效期（秒）
+            max_entries: 最大缓存条目数，超出后按命中次数淘汰
+        """
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+
+    @staticmethod
+    def make_key(stock_code: str, current_date: str, agent_name: str) -> str:
+        """根据股票代码、分析日期和Agent名称生成缓存键"""
+        raw_key = f"{stock_code}|{current_date}|{agent_name}"
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Any]:
+        """读取未过期的缓存值，命中时累加命中次数"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM agent_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if time.time() - created_at > self.ttl:
+                conn.execute(
+                    "DELETE FROM agent_cache WHERE cache_key = ?", (cache_key,))
+                return None
+
+            conn.execute(
+                "UPDATE agent_cache SET hits = hits + 1 WHERE cache_key = ?",
+                (cache_key,)
+            )
+            return json.loads(value)
+
+    def set(self, cache_key: str, value: Any):
+        """写入缓存值，并清理过期条目和超出容量的低频条目"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO agent_cache (cache_key, value, created_at, hits) "
+                "VALUES (?, ?, ?, 0)",
+                (cache_key, json.dumps(value, ensure_ascii=False), now)
+            )
+            conn.execute(
+                "DELETE FROM agent_cache WHERE created_at < ?", (now - self.ttl,))
+
+            count = conn.execute(
+                "SELECT COUNT(*) FROM agent_cache").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    """
+                    DELETE FROM agent_cache WHERE cache_key IN (
+                        SELECT cache_key FROM agent_cache
+                        ORDER BY hits ASC, created_at ASC LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,)
+                )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接（每次操作独立连接，避免跨线程共享），退出时提交并关闭"""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
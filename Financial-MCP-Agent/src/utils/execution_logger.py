@@ -2,13 +2,27 @@
 执行日志系统 - 为每次运行创建独立的日志文件夹
 记录所有agent与LLM的交互信息，包括输入、输出、执行时间等
 """
+import contextvars
+import logging
 import os
-import json
+import queue
+import threading
 import time
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# orjson 直接输出UTF-8字节（等价于 ensure_ascii=False），缩进与原先的 indent=2 一致
+_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+# 记录器关闭后仍到达的写入（极少见）交给这个共享的单线程执行器，按提交顺序写盘，且不阻塞调用线程
+_late_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="execution-logger-late")
 
 
 class ExecutionLogger:
@@ -26,6 +40,18 @@ class ExecutionLogger:
         self.execution_dir = self._create_execution_dir()
         self.start_time = time.time()
 
+        # 日志文件由后台线程写盘，避免在事件循环中执行同步磁盘I/O
+        # 写入任务为 (文件路径, 字节内容, 打开模式)，None 表示停止
+        self._write_queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        # 已提交但可能尚未落盘的JSON文档（序列化后的字节），供 _load_json 读取最新内容
+        self._json_docs: Dict[str, bytes] = {}
+        # 写入线程停止后（close 之后）的写入改为在调用线程中直接写盘，不再进入队列
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name=f"execution-logger-{self.execution_id}", daemon=True)
+        self._writer_thread.start()
+
         # 记录执行开始信息
         self._log_execution_start()
 
@@ -137,7 +163,7 @@ class ExecutionLogger:
 
         # 同时保存输入输出的纯文本版本，方便查看
         self._save_text(
-            f"=== INPUT MESSAGES ===\n{json.dumps(input_messages, ensure_ascii=False, indent=2)}\n\n"
+            f"=== INPUT MESSAGES ===\n{orjson.dumps(input_messages, option=_JSON_OPTIONS).decode('utf-8')}\n\n"
             f"=== OUTPUT CONTENT ===\n{output_content}",
             f"llm_interactions/{agent_name}_{interaction_type}_{interaction_id}.txt"
         )
@@ -186,6 +212,9 @@ class ExecutionLogger:
         end_time = time.time()
         total_execution_time = end_time - self.start_time
 
+        # 生成摘要需要统计磁盘上的日志文件，先等待排队的写入完成
+        self.flush()
+
         # 读取执行信息
         execution_info = self._load_json("execution_info.json") or {}
 
@@ -207,9 +236,53 @@ class ExecutionLogger:
 
         # 生成可读的摘要报告
         self._generate_readable_summary(execution_info)
+        self.close()
 
         return execution_info
 
+    def flush(self):
+        """阻塞直到所有已提交的日志写入磁盘"""
+        self._write_queue.join()
+
+    def close(self):
+        """写完剩余日志并停止后台写入线程"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._write_queue.put(None)
+        self._writer_thread.join()
+
+    def _writer_loop(self):
+        """后台写入线程：按提交顺序把日志写入磁盘"""
+        while True:
+            item = self._write_queue.get()
+            try:
+                if item is None:
+                    return
+                self._write_file(*item)
+            finally:
+                self._write_queue.task_done()
+
+    @staticmethod
+    def _write_file(file_path: Path, payload: bytes, mode: str):
+        """把一次写入落盘；写入失败不应影响分析流程"""
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(file_path, mode) as f:
+                f.write(payload)
+        except OSError as e:
+            logger.warning(f"Failed to write execution log {file_path}: {e}")
+
+    def _enqueue_write(self, filename: str, payload: bytes, mode: str = 'wb'):
+        """提交一次写入到后台线程（序列化已在调用线程完成）；写入线程已停止时交给共享的补写线程"""
+        item = (self.execution_dir / filename, payload, mode)
+        with self._close_lock:
+            if not self._closed:
+                self._write_queue.put(item)
+                return
+        _late_write_executor.submit(self._write_file, *item)
+
     def _generate_execution_summary(self) -> Dict[str, Any]:
         """生成执行摘要"""
         summary = {
@@ -288,63 +361,70 @@ class ExecutionLogger:
 
     def _save_json(self, data: Dict[str, Any], filename: str):
         """保存JSON数据"""
-        file_path = self.execution_dir / filename
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 立即序列化，之后调用方再修改 data 也不会影响写入内容
+        payload = orjson.dumps(data, option=_JSON_OPTIONS)
+        self._json_docs[filename] = payload
+        self._enqueue_write(filename, payload)
 
     def _load_json(self, filename: str) -> Optional[Dict[str, Any]]:
         """加载JSON数据"""
+        if filename in self._json_docs:
+            return orjson.loads(self._json_docs[filename])
+
         file_path = self.execution_dir / filename
         if not file_path.exists():
             return None
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
         except Exception:
             return None
 
     def _append_jsonl(self, data: Dict[str, Any], filename: str):
         """追加JSONL数据"""
-        file_path = self.execution_dir / filename
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(file_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(data, ensure_ascii=False) + '\n')
+        self._enqueue_write(
+            filename, orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE), 'ab')
 
     def _save_text(self, content: str, filename: str):
         """保存文本内容"""
-        file_path = self.execution_dir / filename
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._enqueue_write(filename, content.encode('utf-8'))
 
 
-# 全局执行日志记录器实例
-_execution_logger: Optional[ExecutionLogger] = None
+# 当前运行的执行日志记录器。按上下文隔离：共享事件循环上并发的多个工作流各自持有自己的记录器，
+# 工作流内的各Agent节点（LangGraph在复制的上下文中执行）读取到的是所属运行的记录器
+_current_execution_logger: "contextvars.ContextVar[Optional[ExecutionLogger]]" = contextvars.ContextVar(
+    "execution_logger", default=None)
 
 
 def get_execution_logger() -> ExecutionLogger:
-    """获取全局执行日志记录器"""
-    global _execution_logger
-    if _execution_logger is None:
-        _execution_logger = ExecutionLogger()
-    return _execution_logger
+    """获取当前运行的执行日志记录器（不存在时为当前上下文创建一个）"""
+    execution_logger = _current_execution_logger.get()
+    if execution_logger is None:
+        execution_logger = ExecutionLogger()
+        _current_execution_logger.set(execution_logger)
+    return execution_logger
 
 
 def initialize_execution_logger(base_log_dir: str = "logs") -> ExecutionLogger:
-    """初始化执行日志记录器"""
-    global _execution_logger
-    _execution_logger = ExecutionLogger(base_log_dir)
-    return _execution_logger
-
-
-def finalize_execution_logger(success: bool = True, error: str = None):
-    """完成执行日志记录"""
-    global _execution_logger
-    if _execution_logger:
-        _execution_logger.finalize_execution(success, error)
-        _execution_logger = None
+    """为当前运行初始化执行日志记录器"""
+    execution_logger = ExecutionLogger(base_log_dir)
+    _current_execution_logger.set(execution_logger)
+    return execution_logger
+
+
+def finalize_execution_logger(success: bool = True, error: str = None,
+                              execution_logger: Optional[ExecutionLogger] = None):
+    """
+    完成执行日志记录并停止其写入线程
+
+    Args:
+        success: 执行是否成功
+        error: 错误信息
+        execution_logger: 要完成的记录器；未指定时使用当前上下文中的记录器
+    """
+    execution_logger = execution_logger or _current_execution_logger.get()
+    if execution_logger:
+        execution_logger.finalize_execution(success, error)
+        if _current_execution_logger.get() is execution_logger:
+            _current_execution_logger.set(None)
@@ -0,0 +1,42 @@
+"""
+LLM响应缓存 - 按命名空间（股票代码:分析日期）隔离的LangChain LLM缓存
+同一股票同一天的重复分析会直接复用相同提示词的模型输出
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.caches import InMemoryCache
+
+# 每个命名空间内最多缓存的LLM响应数
+_MAX_ENTRIES_PER_NAMESPACE = 256
+# 最多同时保留的命名空间数，超出后淘汰最久未使用的命名空间
+_MAX_NAMESPACES = 64
+
+_caches: "OrderedDict[str, InMemoryCache]" = OrderedDict()
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache(namespace: Optional[str]) -> Optional[InMemoryCache]:
+    """
+    获取指定命名空间的LLM缓存
+
+    Args:
+        namespace: 缓存命名空间，通常为 "股票代码:分析日期"
+
+    Returns:
+        可传给 ChatOpenAI(cache=...) 的缓存实例；命名空间为空时返回None（不缓存）
+    """
+    if not namespace:
+        return None
+
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = InMemoryCache(maxsize=_MAX_ENTRIES_PER_NAMESPACE)
+            _caches[namespace] = cache
+            if len(_caches) > _MAX_NAMESPACES:
+                _caches.popitem(last=False)
+        else:
+            _caches.move_to_end(namespace)
+        return cache
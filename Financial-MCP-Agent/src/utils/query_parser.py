@@ -0,0 +1,90 @@
+"""
+查询解析 - 从用户的自然语言请求中提取公司名称和股票代码
+"""
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# 带括号的 "公司名(代码)" 组合模式，按优先级排列，模块加载时一次性编译
+_CODE_PATTERNS = (
+    re.compile(r'请帮我分析一下\s*([^（(]+?)\s*[（(](\d{5,6})[)）]'),
+    re.compile(r'分析一下\s*([^（(]+?)\s*[（(](\d{5,6})[)）]'),
+    re.compile(r'分析\s*([^（(]+?)\s*[（(](\d{5,6})[)）]'),
+    re.compile(r'分析\s*[（(](\d{5,6})[)）]\s*([^）)]+)'),
+    re.compile(r'帮我看看\s*[（(](\d{5,6})[)）]\s*([^）)]+?)(?:\s*这只|\s*这个)?\s*股票'),
+    re.compile(r'我想了解一下\s*([^（(]+?)\s*[（(](\d{5,6})[)）]'),
+    re.compile(r'帮我看看\s*([^（(]+?)\s*[（(](\d{5,6})[)）]'),
+    re.compile(r'^([^（(]+?)\s*[（(](\d{5,6})[)）]'),
+)
+
+# 所有组合模式都要求出现带括号的代码，先用一次扫描判断是否需要逐个尝试
+_BRACKETED_CODE_PATTERN = re.compile(r'[（(]\d{5,6}[)）]')
+
+# 单独出现的股票代码
+_BARE_CODE_PATTERN = re.compile(r'\b(\d{5,6})\b')
+
+# 公司名称的通用模式
+_NAME_PATTERNS = (
+    re.compile(r'分析(?:一下)?\s*([^0-9（）()\s]+)'),
+    re.compile(r'([^0-9（）()\s]+)\s*(?:这只|这个|的)?\s*股票'),
+    re.compile(r'(?:了解|看看|给我分析)一下\s*([^0-9（）()\s]+)'),
+    re.compile(r'([^0-9（）()\s]+?)\s*的\s*(?:财务|估值|风险|价值|基本面)'),
+)
+
+# 避免被误识别为公司名称的词
+_INVALID_NAMES = ("股票", "价值", "公司")
+
+# 公司名称中需要清除的无意义词汇
+# 按顺序逐个删除：删除前面的词后可能拼出后面的词（如 "这的个" -> "这个"），顺序会影响结果
+_STOP_WORDS = ('的', '这个', '这只', '一下', '看看', '了解', '分析', '帮我', '我想', '给我')
+
+
+@lru_cache(maxsize=1024)
+def extract_stock_info(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    精确提取股票代码和公司名称
+
+    结果只取决于查询文本，按查询缓存，重复提交同一查询时直接返回
+
+    Args:
+        query: 用户输入的分析请求
+
+    Returns:
+        (公司名称, 股票代码)，未识别出的部分为None
+    """
+    stock_code: Optional[str] = None
+    company_name: Optional[str] = None
+    if _BRACKETED_CODE_PATTERN.search(query):
+        for pattern in _CODE_PATTERNS:
+            match = pattern.search(query)
+            if match:
+                if match.group(1).isdigit():
+                    stock_code, company_name = match.group(1), match.group(2).strip()
+                else:
+                    company_name, stock_code = match.group(1).strip(), match.group(2)
+                return company_name, stock_code
+
+    # 如果没有匹配到带括号的组合，则分别匹配公司名和代码
+    # 优先匹配代码
+    code_match = _BARE_CODE_PATTERN.search(query)
+    if code_match:
+        stock_code = code_match.group(1)
+
+    # 匹配公司名称 (更通用的模式)
+    for pattern in _NAME_PATTERNS:
+        name_match = pattern.search(query)
+        if name_match:
+            potential_name = name_match.group(1).strip()
+            # 避免匹配到 "股票" "价值" 等词
+            if len(potential_name) >= 2 and potential_name not in _INVALID_NAMES:
+                company_name = potential_name
+                break  # 找到一个就停止
+
+    if company_name:
+        for word in _STOP_WORDS:
+            company_name = company_name.replace(word, '')
+        company_name = company_name.strip()
+        if len(company_name) < 2:
+            company_name = None
+
+    return company_name, stock_code
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询解析模块测试脚本
+验证 src/utils/query_parser.py 中应用实际使用的提取逻辑：
+与重构前内联在 main_refactored.py 中的提取结果保持一致，并覆盖停用词的删除顺序
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from utils.query_parser import extract_stock_info
+
+
+def test_query_parser():
+    """逐条比对查询解析结果"""
+
+    test_cases = [
+        # ============================================================================
+        # 1. 停用词按顺序删除：先删 "的" 后拼出的 "这个" 不再被删除
+        # ============================================================================
+        ("分析 这的个茅台", "茅台", None),
+
+        # ============================================================================
+        # 2. 与重构前 main_refactored.py 内联提取逻辑的输出一致
+        # ============================================================================
+        ("分析嘉友国际", "嘉友国际", None),
+        ("分析嘉友国际(603871)", "嘉友国际", "603871"),
+        ("分析(603871)嘉友国际", "嘉友国际", "603871"),
+        ("分析 嘉友国际 (603871)", "嘉友国际", "603871"),
+        ("分析嘉友国际（603871）", "嘉友国际", "603871"),
+        ("分析嘉友国际(603871）", "嘉友国际", "603871"),
+        ("分析（603871）嘉友国际", "嘉友国际", "603871"),
+        ("请帮我分析一下嘉友国际(603871)这只股票的投资价值如何", "嘉友国际", "603871"),
+        ("分析一下嘉友国际(603871)的财务状况", "嘉友国际", "603871"),
+        ("给我分析一下宁德时代的财务状况", "宁德时代财务状况", None),
+        ("分析一下比亚迪的基本面情况", "比亚迪基本面情况", None),
+        ("请帮我分析一下腾讯(00700)的投资价值", "腾讯", "00700"),
+        ("帮我看看比亚迪这只股票怎么样", "比亚迪", None),
+        ("我想了解一下腾讯的投资价值", "腾讯投资价值", None),
+        ("帮我看看(000001)平安银行这只股票", "平安银行", "000001"),
+        ("我想了解一下比亚迪(002594)的投资价值", "比亚迪", "002594"),
+        ("帮我看看茅台这只股票的基本面", "茅台", None),
+        ("603871 这个股票值得买吗？", None, "603871"),
+        ("603871这个股票最近表现怎么样，值得投资吗", None, None),
+        ("000001", None, "000001"),
+        ("002594", None, "002594"),
+        ("600036", None, "600036"),
+        ("嘉友国际这只股票值得投资吗", "嘉友国际", None),
+        ("比亚迪的投资价值如何", None, None),
+        ("腾讯的股票怎么样", "腾讯", None),
+        ("平安银行(000001)值得买吗", "平安银行", "000001"),
+        ("茅台(600519)的投资价值分析", "茅台", "600519"),
+        ("分析一下宁德时代的财务状况", "宁德时代财务状况", None),
+        ("嘉友国际的财务表现如何", "嘉友国际", None),
+        ("比亚迪的盈利能力怎么样", None, None),
+        ("腾讯的现金流状况", None, None),
+        ("平安银行的资产负债情况", None, None),
+        ("嘉友国际的技术面怎么样", None, None),
+        ("比亚迪的股价走势分析", None, None),
+        ("腾讯的技术指标如何", None, None),
+        ("平安银行(000001)的技术分析", "平安银行", "000001"),
+        ("茅台的技术面表现", None, None),
+        ("嘉友国际的估值水平如何", "嘉友国际", None),
+        ("比亚迪的市盈率分析", None, None),
+        ("腾讯的市净率怎么样", None, None),
+        ("平安银行(000001)的估值", "平安银行", "000001"),
+        ("茅台的估值是否合理", "茅台", None),
+        ("嘉友国际在行业中的地位", None, None),
+        ("嘉友国际的投资风险如何", None, None),
+        ("比亚迪面临的主要风险", None, None),
+        ("腾讯的风险因素分析", "腾讯", None),
+        ("平安银行(000001)的风险评估", "平安银行", "000001"),
+        ("茅台的投资风险", None, None),
+        ("分析", None, None),
+        ("分析123456", None, None),
+        ("嘉友国际", None, None),
+        ("603871", None, "603871"),
+        ("", None, None),
+        ("分析一下", None, None),
+        ("帮我看看", None, None),
+        ("分析一下嘉友国际(603871)这只股票的投资价值如何", "嘉友国际", "603871"),
+        ("我想了解一下比亚迪这只股票的基本面情况", "比亚迪", None),
+        ("请帮我分析一下腾讯(00700)这只股票怎么样", "腾讯", "00700"),
+        ("帮我看看茅台(600519)这只股票值得投资吗", "茅台", "600519"),
+        ("分析一下平安银行(000001)的财务状况如何", "平安银行", "000001"),
+        ("帮我看看这个茅台股票", "茅台", None),
+        ("我想了解一下宁德时代", "宁德时代", None),
+        ("分析股票", None, None),
+        ("给我分析一下比亚迪的估值", "比亚迪估值", None),
+        ("分析一下 贵州茅台 600519", "贵州茅台", "600519"),
+        ("茅台的财务状况怎么样", "茅台", None),
+    ]
+
+    print("🧪 查询解析模块测试")
+    print("=" * 100)
+
+    passed = 0
+    failed = 0
+
+    for i, (query, expected_company, expected_stock) in enumerate(test_cases, 1):
+        company_name, stock_code = extract_stock_info(query)
+
+        test_passed = company_name == expected_company and stock_code == expected_stock
+        if test_passed:
+            passed += 1
+        else:
+            failed += 1
+            print(f"测试 {i:2d}: ❌ 失败")
+            print(f"      查询: {query}")
+            print(f"      期望: 公司={expected_company or 'None'}, 代码={expected_stock or 'None'}")
+            print(f"      实际: 公司={company_name or 'None'}, 代码={stock_code or 'None'}")
+            print("-" * 100)
+
+    # 同一查询再次解析应直接命中缓存
+    hits_before = extract_stock_info.cache_info().hits
+    extract_stock_info(test_cases[0][0])
+    if extract_stock_info.cache_info().hits == hits_before + 1:
+        passed += 1
+    else:
+        failed += 1
+        print("❌ 重复查询未命中缓存")
+
+    total = passed + failed
+    print(f"\n📊 测试统计:")
+    print(f"   总测试数: {total}")
+    print(f"   通过数量: {passed}")
+    print(f"   失败数量: {failed}")
+
+    if failed == 0:
+        print(f"\n🎉 所有测试都通过了！查询解析逻辑工作正常。")
+    else:
+        print(f"\n⚠️  有 {failed} 个测试失败，查询解析结果与预期不一致。")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    test_query_parser()